@@ -0,0 +1,295 @@
+"""
+公表されている国際収支統計（CSV / Excel）をローカルファイルから読み込み、
+「国際収支デモ」ページの取引記録と同じ列構成に変換するモジュールです。
+
+Features:
+1. **項目の対応付け**:
+    - BPM6 の項目名（日本語・英語）を、デモの `transaction_types` / `ca_categories`
+      と同じ「経常収支」「金融収支」の区分に対応付けます。
+    - 「経常収支」「金融収支」などの合計項目や、デモに区分のない
+      「資本移転等収支」「誤差脱漏」は二重計上を避けるため読み込みません。
+
+2. **分割・型付きの読み込み**:
+    - CSV は `chunksize` 単位で読み込み、期間は datetime64、金額は float64、
+      項目は category 型に変換します。
+    - 縦持ち（期間・項目・金額の3列。SDMX 形式の TIME_PERIOD / INDICATOR / OBS_VALUE を含む）と
+      横持ち（期間の列 + 項目ごとの列）の両方の表形式に対応します。
+    - 期間ごとに頻度（年次・四半期・月次）を判定し、年計と月次のように頻度が混在する表では
+      最も細かい頻度の行だけを残します（二重計上を防ぐため）。読み飛ばした行の期間表記は
+      `attrs["unparsed_periods"]` に残ります。
+
+3. **解析結果のキャッシュ**:
+    - 解析済みのデータは元ファイルの SHA-256 をキーとした Parquet ファイルとして
+      `.bop_cache/` に保存され、同じファイルの再読み込みは Parquet の読み込みだけで済みます。
+
+符号の扱い:
+- 公表統計の経常収支の各項目は「受取 − 支払」なので、正の値を貸方、負の値を借方とします。
+- 公表統計の金融収支は「資産の純増 − 負債の純増」なので、正の値を借方（資産増加）、
+  負の値を貸方とします。デモの金融収支（貸方 − 借方）とは符号が逆になります。
+"""
+import hashlib
+import io
+import os
+import re
+import tempfile
+import unicodedata
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+CACHE_DIR = Path(__file__).parent / ".bop_cache"
+# 項目の対応付けや解析方法を変更した場合は上げて、古いキャッシュを無効にする
+CACHE_VERSION = 3
+CHUNK_SIZE = 50_000
+
+# 公表統計の項目名 → (収支の種類, 区分)
+BOP_ITEMS = {
+    # 経常収支
+    "貿易収支": ("経常収支", "貿易収支"),
+    "Goods": ("経常収支", "貿易収支"),
+    "サービス収支": ("経常収支", "サービス収支"),
+    "Services": ("経常収支", "サービス収支"),
+    "第一次所得収支": ("経常収支", "第一次所得収支"),
+    "Primary income": ("経常収支", "第一次所得収支"),
+    "第二次所得収支": ("経常収支", "第二次所得収支"),
+    "Secondary income": ("経常収支", "第二次所得収支"),
+
+    # 金融収支
+    "直接投資": ("金融収支", "直接投資"),
+    "Direct investment": ("金融収支", "直接投資"),
+    "証券投資": ("金融収支", "証券投資"),
+    "Portfolio investment": ("金融収支", "証券投資"),
+    "金融派生商品": ("金融収支", "金融派生商品"),
+    "Financial derivatives": ("金融収支", "金融派生商品"),
+    "その他投資": ("金融収支", "その他投資"),
+    "Other investment": ("金融収支", "その他投資"),
+    "外貨準備": ("金融収支", "外貨準備"),
+    "Reserve assets": ("金融収支", "外貨準備"),
+}
+
+PERIOD_COLUMNS = ["期間", "年月", "日付", "日時", "時点", "period", "time_period", "date", "time"]
+ITEM_COLUMNS = ["項目", "項目名", "区分", "item", "indicator", "bpm6", "series"]
+VALUE_COLUMNS = ["金額", "値", "計数", "value", "amount", "obs_value"]
+
+MONTH_NAMES = {name: i + 1 for i, name in enumerate(
+    ["jan", "feb", "mar", "apr", "may", "jun", "jul", "aug", "sep", "oct", "nov", "dec"])}
+
+# 頻度（細かいほど大きい値）。年計と月次が混在する表では最も細かい頻度の行だけを使う
+FREQUENCIES = {"年次": 1, "四半期": 2, "月次": 3}
+
+# 期間表記のパターン（NFKC 正規化・小文字化した文字列に完全一致させる）
+# month / month_name を含むものは月次、quarter を含むものは四半期、year だけのものは年次
+_TIME = r"(?:[ t]\d{1,2}:\d{2}(?::\d{2})?)?"
+PERIOD_PATTERNS = [
+    # 2024/01, 2024-01-31, 2024.1, 2024年1月, 2024年1月31日
+    rf"(?P<year>\d{{4}})\s*[-/.年]\s*(?P<month>\d{{1,2}})\s*(?:月(?:\d{{1,2}}日)?|[-/.]\d{{1,2}})?{_TIME}",
+    # 202401（日本銀行のフラットファイルなど）
+    r"(?P<year>\d{4})(?P<month>\d{2})",
+    # 2024-M01, 2024M1（SDMX / IMF）
+    r"(?P<year>\d{4})-?m(?P<month>\d{1,2})",
+    # 2024Q2, 2024-Q2, 2024年第2四半期
+    r"(?P<year>\d{4})\s*(?:[-/ ]?q|年第)(?P<quarter>[1-4])(?:四半期)?",
+    # Q2 2024, Q2-2024
+    r"q(?P<quarter>[1-4])[-/ ]?(?P<year>\d{4})",
+    # Jan-2024, January 2024
+    r"(?P<month_name>[a-z]{3})[a-z]*\.?[-/ ]?(?P<year>\d{4})",
+    # 2024-Jan, 2024 January
+    r"(?P<year>\d{4})[-/ ]?(?P<month_name>[a-z]{3})[a-z]*\.?",
+    # 2024, 2024年（年次データ）
+    r"(?P<year>\d{4})年?",
+]
+
+RECORD_COLUMNS = ["日時", "取引", "金額", "メモ", "経常収支区分", "経常収支（借方）", "経常収支（貸方）",
+                  "金融収支区分_借方", "金融収支区分_貸方", "金融収支（借方）", "金融収支（貸方）",
+                  "詳細（借方）", "詳細（貸方）"]
+
+
+def _normalize_label(label):
+    """全角・半角や空白、先頭の番号の違いを吸収した比較用の項目名を返す"""
+    label = unicodedata.normalize("NFKC", str(label)).strip().lower()
+    label = re.sub(r"^[\d.()\s]+", "", label)  # 「1.」「(2)」などの番号を除去
+    return re.sub(r"\s+", " ", label)
+
+
+_ITEM_LOOKUP = {_normalize_label(name): name for name in BOP_ITEMS}
+
+
+def _find_column(columns, candidates):
+    normalized = {_normalize_label(c): c for c in columns}
+    for candidate in candidates:
+        if candidate in normalized:
+            return normalized[candidate]
+    return None
+
+
+def _parse_periods(values):
+    """
+    「2024/01」「2024年1月」「Jan-2024」「2024Q2」などの期間表記を期首の日付に変換し、
+    期間（datetime64）と頻度（年次・四半期・月次）の2列の DataFrame を返す。
+    PERIOD_PATTERNS のどれにも一致しない表記（「合計」や注記など）は推測せず NaT にする。
+    """
+    text = values.astype("string").str.normalize("NFKC").str.strip().str.lower()
+    year = pd.Series(np.nan, index=values.index)
+    month = pd.Series(np.nan, index=values.index)
+    frequency = pd.Series(None, index=values.index, dtype=object)
+    for pattern in PERIOD_PATTERNS:
+        parts = text.str.extract(f"^{pattern}$")
+        matched = year.isna() & parts["year"].notna()
+        if "month" in parts:
+            found_month, found_frequency = pd.to_numeric(parts["month"], errors="coerce"), "月次"
+        elif "month_name" in parts:
+            found_month, found_frequency = parts["month_name"].map(MONTH_NAMES).astype("float64"), "月次"
+        elif "quarter" in parts:
+            found_month, found_frequency = pd.to_numeric(parts["quarter"], errors="coerce") * 3 - 2, "四半期"
+        else:
+            found_month, found_frequency = pd.Series(1.0, index=values.index), "年次"
+        year[matched] = pd.to_numeric(parts["year"][matched])
+        month[matched] = found_month[matched]
+        frequency[matched] = found_frequency
+
+    periods = pd.Series(pd.NaT, index=values.index, dtype="datetime64[ns]")
+    valid = year.notna() & month.between(1, 12)
+    if valid.any():
+        periods[valid] = pd.to_datetime(pd.DataFrame({
+            "year": year[valid].astype(int), "month": month[valid].astype(int), "day": 1}))
+    return pd.DataFrame({"期間": periods, "頻度": frequency.where(valid)})
+
+
+def _parse_amounts(values):
+    """「1,234」「△500」「▲500」「(200)」などの表記を数値に変換する（△・▲・括弧は負の値）"""
+    cleaned = (values.astype("string").str.normalize("NFKC")
+               .str.replace(r"[,\s]", "", regex=True)
+               .str.replace(r"^[△▲−]", "-", regex=True)
+               .str.replace(r"^\((.+)\)$", r"-\1", regex=True))
+    return pd.to_numeric(cleaned, errors="coerce").astype("float64")
+
+
+def _tidy_chunk(chunk):
+    """
+    読み込んだ表の一部を 期間・頻度・項目・金額・期間表記 の縦持ちデータに変換する。
+    項目と金額はあるのに期間を解釈できなかった行の期間表記と、期間の列名も合わせて返す。
+    """
+    period_col = _find_column(chunk.columns, PERIOD_COLUMNS)
+    if period_col is None:
+        period_col = chunk.columns[0]  # 見出しのない先頭列を期間とみなす
+
+    item_col = _find_column(chunk.columns, ITEM_COLUMNS)
+    value_col = _find_column(chunk.columns, VALUE_COLUMNS)
+    if item_col is not None and value_col is not None:
+        long = chunk[[period_col, item_col, value_col]].set_axis(["期間", "項目", "金額"], axis=1)
+    else:
+        item_cols = [c for c in chunk.columns if _normalize_label(c) in _ITEM_LOOKUP]
+        long = chunk.melt(id_vars=[period_col], value_vars=item_cols, var_name="項目", value_name="金額")
+        long = long.rename(columns={period_col: "期間"})
+
+    long["項目"] = long["項目"].map(lambda label: _ITEM_LOOKUP.get(_normalize_label(label)))
+    long["期間表記"] = long["期間"].astype(str)
+    long[["期間", "頻度"]] = _parse_periods(long["期間"])
+    long["金額"] = _parse_amounts(long["金額"])
+
+    unparsed = long["期間"].isna() & long["項目"].notna() & long["金額"].notna()
+    return long.dropna(subset=["期間", "項目", "金額"]), set(long["期間表記"][unparsed]), period_col
+
+
+def _detect_encoding(data):
+    try:
+        data.decode("utf-8-sig")
+        return "utf-8-sig"
+    except UnicodeDecodeError:
+        return "cp932"  # 日本の公表統計で多い Shift_JIS 系
+
+
+def parse_bop_file(data, filename):
+    """CSV / Excel のバイト列を解析し、期間・項目・金額の縦持ち DataFrame を返す"""
+    if Path(filename).suffix.lower() in (".xlsx", ".xlsm"):
+        chunks = [pd.read_excel(io.BytesIO(data), dtype=str)]
+    else:
+        chunks = pd.read_csv(io.BytesIO(data), dtype=str, encoding=_detect_encoding(data),
+                             chunksize=CHUNK_SIZE, skipinitialspace=True)
+
+    frames = []
+    unparsed = set()
+    period_col = None
+    for chunk in chunks:
+        frame, chunk_unparsed, period_col = _tidy_chunk(chunk)
+        frames.append(frame)
+        unparsed |= chunk_unparsed
+    if not frames or all(frame.empty for frame in frames):
+        if unparsed:
+            examples = "、".join(sorted(unparsed)[:5])
+            raise ValueError(f"国際収支の項目は見つかりましたが、期間の列「{period_col}」の表記を解釈できません（例: {examples}）。")
+        raise ValueError("国際収支の項目（貿易収支・直接投資など）を含むデータが見つかりません。")
+
+    tidy = pd.concat(frames, ignore_index=True)
+
+    # 年計と月次などが混在する場合は最も細かい頻度の行だけを残し、それ以外は読み飛ばした期間として扱う
+    finest = max(tidy["頻度"].unique(), key=FREQUENCIES.get)
+    coarser = tidy["頻度"] != finest
+    unparsed |= set(tidy.loc[coarser, "期間表記"])
+    tidy = tidy.loc[~coarser].drop(columns="期間表記")
+
+    tidy["項目"] = pd.Categorical(tidy["項目"], categories=list(dict.fromkeys(BOP_ITEMS)))
+    tidy["頻度"] = pd.Categorical(tidy["頻度"], categories=list(FREQUENCIES))
+    tidy = tidy[["期間", "頻度", "項目", "金額"]].sort_values(["期間", "項目"], ignore_index=True)
+    # 読み飛ばした期間表記（「合計」や頻度の異なる行など）は attrs に残し、Parquet のキャッシュにも保存する
+    tidy.attrs["unparsed_periods"] = sorted(unparsed)
+    return tidy
+
+
+def load_bop_file(data, filename, cache_dir=CACHE_DIR):
+    """
+    解析済みの Parquet キャッシュがあればそれを返し、なければ解析してキャッシュに保存する。
+    キャッシュのキーは元ファイルの内容の SHA-256 なので、ファイル名や置き場所が変わっても再利用されます。
+    """
+    source_hash = hashlib.sha256(data).hexdigest()
+    cache_path = Path(cache_dir) / f"{source_hash}_v{CACHE_VERSION}.parquet"
+    if cache_path.exists():
+        return pd.read_parquet(cache_path)
+
+    tidy = parse_bop_file(data, filename)
+    # 同じファイルを複数のセッションが同時に読み込んでも衝突しないよう、一意な一時ファイルに書いてから置き換える
+    # キャッシュを書けない環境でも解析結果はそのまま返す
+    tmp_path = None
+    try:
+        cache_path.parent.mkdir(parents=True, exist_ok=True)
+        with tempfile.NamedTemporaryFile(dir=cache_path.parent, suffix=".tmp", delete=False) as tmp:
+            tmp_path = tmp.name
+        tidy.to_parquet(tmp_path, index=False)
+        os.replace(tmp_path, cache_path)
+    except OSError:
+        if tmp_path is not None and os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    return tidy
+
+
+def to_records(tidy):
+    """縦持ちの統計データを「国際収支デモ」の取引記録と同じ列構成の DataFrame に変換する"""
+    account_type = tidy["項目"].map(lambda item: BOP_ITEMS[item][0]).astype(str).to_numpy()
+    category = tidy["項目"].map(lambda item: BOP_ITEMS[item][1]).astype(str).to_numpy()
+    value = tidy["金額"].to_numpy(dtype="float64")
+    amount = np.abs(value)
+
+    is_ca = account_type == "経常収支"
+    is_fa = account_type == "金融収支"
+    # 経常収支は正の値が貸方、金融収支は正の値（資産の純増）が借方
+    ca_credit = is_ca & (value >= 0)
+    ca_debit = is_ca & (value < 0)
+    fa_debit = is_fa & (value >= 0)
+    fa_credit = is_fa & (value < 0)
+
+    return pd.DataFrame({
+        "日時": tidy["期間"].to_numpy(),
+        "取引": tidy["項目"].astype(str).to_numpy(),
+        "金額": amount,
+        "メモ": "",
+        "経常収支区分": np.where(is_ca, category, ""),
+        "経常収支（借方）": np.where(ca_debit, amount, np.nan),
+        "経常収支（貸方）": np.where(ca_credit, amount, np.nan),
+        "金融収支区分_借方": np.where(fa_debit, category, ""),
+        "金融収支区分_貸方": np.where(fa_credit, category, ""),
+        "金融収支（借方）": np.where(fa_debit, amount, np.nan),
+        "金融収支（貸方）": np.where(fa_credit, amount, np.nan),
+        "詳細（借方）": "",
+        "詳細（貸方）": "",
+    }, columns=RECORD_COLUMNS)
@@ -0,0 +1,349 @@
+"""
+国際収支・弾力性計算アプリ（Streamlit）の負荷試験スクリプトです。
+
+アプリをローカルで起動し、ブラウザと同じ WebSocket プロトコル（/_stcore/stream）で
+複数の仮想セッションを同時に接続して、各ページの操作を再現します。
+サーバーは 127.0.0.1 にのみ公開し、外部ネットワークには接続しません。
+
+Scenarios:
+1. **国際収支デモ**:
+    - 取引の種類と金額を選び、「取引を記録」を押します。
+    - 「国際収支分析」タブの切り替えはブラウザ内で完結し再実行を伴わないため、
+      記録のたびに増える取引の集計・グラフ描画は「取引を記録」の再実行時間に含まれます。
+
+2. **為替レート計算**:
+    - 2つの為替レートのスライダーを動かします。
+
+3. **弾力性計算**:
+    - 計算項目を切り替え、弾力性や数量・価格の入力値を変更します。
+
+Outputs:
+- 同時接続数ごとの再実行レイテンシ（p50 / p95 / p99）
+- スループット（1秒あたりの再実行回数）
+- サーバープロセスの最大 RSS
+
+Usage:
+    uv sync  # WebSocket クライアントの tornado は streamlit の依存パッケージとして入ります
+    python loadtest.py --concurrency 1 5 10 20 --duration 30
+    python loadtest.py --concurrency 50 --url ws://127.0.0.1:8501/_stcore/stream  # 起動済みのサーバーを使う
+
+計測の前に各シナリオを1回ずつ実行するスモークテストを行い、ページで例外が発生した場合は
+計測せずに終了します（例外の再実行を計測してしまうのを防ぐため）。
+ウィジェットの値は、このスクリプトを実行する環境の Streamlit のバージョンに合わせた形式で送ります
+（selectbox は 1.45 未満では選択肢の添字、1.45 以降では表示ラベル）。--url で接続するサーバーも
+同じバージョンの Streamlit で起動してください。
+
+仮想セッションはすべてこのプロセスの1つのイベントループで動くため、
+数百セッション規模ではクライアント側の処理もレイテンシに含まれる点に注意してください。
+"""
+import argparse
+import asyncio
+import csv
+import random
+import socket
+import subprocess
+import sys
+import time
+import urllib.request
+from pathlib import Path
+
+import numpy as np
+import streamlit
+from packaging.version import Version
+from streamlit.proto.BackMsg_pb2 import BackMsg
+from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+from streamlit.proto.WidgetStates_pb2 import WidgetState
+from tornado.websocket import websocket_connect
+
+APP_PATH = Path(__file__).parent / "app.py"
+WIDGET_TYPES = ("button", "slider", "number_input", "selectbox", "text_input")
+# Streamlit 1.45 から selectbox の値は選択肢の添字（int_value）ではなく表示ラベル（string_value）で送る
+SELECTBOX_SENDS_LABEL = Version(streamlit.__version__) >= Version("1.45.0")
+
+
+class SimulatedSession:
+    """ブラウザの1タブに相当する仮想セッション"""
+
+    def __init__(self, url, think_time, rng):
+        self.url = url
+        self.think_time = think_time
+        self.rng = rng
+        self.ws = None
+        self.pages = {}
+        self.page_script_hash = ""
+        self.widgets = {}
+        self.widget_values = {}
+        self.latencies = []
+        self.errors = 0
+
+    async def connect(self):
+        self.ws = await websocket_connect(self.url, subprotocols=["streamlit"], max_message_size=256 * 1024 * 1024)
+        await self._rerun()
+
+    def close(self):
+        if self.ws is not None:
+            self.ws.close()
+
+    async def open_page(self, page_name):
+        if self.pages.get(page_name) == self.page_script_hash:
+            return
+        self.page_script_hash = self.pages[page_name]
+        self.widget_values = {}
+        await self.act()
+
+    def widget(self, label, index=0):
+        return self.widgets[label][index][1]
+
+    def set(self, label, value, index=0):
+        """次の再実行で送るウィジェットの値を設定する"""
+        kind, proto = self.widgets[label][index]
+        state = WidgetState(id=proto.id)
+        if kind == "slider":
+            state.double_array_value.data.append(float(value))
+        elif kind == "number_input":
+            state.double_value = float(value)
+        elif kind == "selectbox":
+            index = list(proto.options).index(value) if isinstance(value, str) else value
+            if SELECTBOX_SENDS_LABEL:
+                state.string_value = proto.options[index]
+            else:
+                state.int_value = index
+        elif kind == "text_input":
+            state.string_value = str(value)
+        else:
+            raise ValueError(f"値を設定できないウィジェットです: {label}（{kind}）")
+        self.widget_values[proto.id] = state
+
+    async def click(self, label, index=0):
+        _, proto = self.widgets[label][index]
+        await self.act(WidgetState(id=proto.id, trigger_value=True))
+
+    async def act(self, *triggers):
+        """利用者の操作間隔を待ってから再実行を要求し、完了までの時間を記録する"""
+        await asyncio.sleep(self.rng.uniform(0, 2 * self.think_time))
+        start = time.perf_counter()
+        await self._rerun(*triggers)
+        self.latencies.append(time.perf_counter() - start)
+
+    async def _rerun(self, *triggers):
+        msg = BackMsg()
+        msg.rerun_script.page_script_hash = self.page_script_hash
+        msg.rerun_script.widget_states.widgets.extend([*self.widget_values.values(), *triggers])
+        await self.ws.write_message(msg.SerializeToString(), binary=True)
+
+        widgets = {}
+        while True:
+            payload = await self.ws.read_message()
+            if payload is None:
+                raise ConnectionError("サーバーとの接続が切れました")
+            fwd = ForwardMsg()
+            fwd.ParseFromString(payload)
+            msg_type = fwd.WhichOneof("type")
+            if msg_type == "navigation":
+                self.pages = {page.page_name: page.page_script_hash for page in fwd.navigation.app_pages}
+                self.page_script_hash = fwd.navigation.page_script_hash
+            elif msg_type == "delta" and fwd.delta.WhichOneof("type") == "new_element":
+                element = fwd.delta.new_element
+                element_type = element.WhichOneof("type")
+                if element_type == "exception":
+                    self.errors += 1
+                elif element_type in WIDGET_TYPES:
+                    proto = getattr(element, element_type)
+                    widgets.setdefault(proto.label, []).append((element_type, proto))
+            elif msg_type == "script_finished":
+                self.widgets = widgets
+                return
+
+
+async def scenario_bop_demo(session):
+    await session.open_page("国際収支デモ")
+    options = session.widget("取引の種類を選んでください：").options
+    session.set("取引の種類を選んでください：", session.rng.randrange(len(options)))
+    await session.act()
+    session.set("金額（ドル）", session.rng.randint(1, 1000))
+    await session.act()
+    await session.click("取引を記録")
+
+
+async def scenario_exchange_rate(session):
+    await session.open_page("為替レート計算")
+    for _ in range(3):
+        index = session.rng.randrange(2)
+        session.set("為替レート (1ドルあたりの円)", session.rng.randint(50, 200), index=index)
+        await session.act()
+
+
+async def scenario_elasticity(session):
+    await session.open_page("弾力性計算")
+    options = list(session.widget("計算する項目を選んでください").options)
+    session.set("計算する項目を選んでください", session.rng.choice(options))
+    await session.act()
+    # 選んだ計算項目で表示される数値入力をいくつか変更する
+    number_inputs = [label for label, found in session.widgets.items() if found[0][0] == "number_input"]
+    for label in session.rng.sample(number_inputs, k=min(2, len(number_inputs))):
+        session.set(label, round(session.rng.uniform(0.1, 200.0), 1))
+        await session.act()
+
+
+SCENARIOS = [scenario_bop_demo, scenario_exchange_rate, scenario_elasticity]
+
+
+async def run_user(url, deadline, think_time, seed):
+    session = SimulatedSession(url, think_time, random.Random(seed))
+    try:
+        await session.connect()
+        while time.perf_counter() < deadline:
+            await session.rng.choice(SCENARIOS)(session)
+    except Exception as e:
+        # ページが途中で例外になりウィジェットが見つからない場合なども、このセッションだけを止めて計測を続ける
+        print(f"セッション {seed} でエラーが発生しました: {e!r}", file=sys.stderr)
+        session.errors += 1
+    finally:
+        session.close()
+    return session
+
+
+async def smoke_test(url):
+    """各シナリオを1回ずつ実行し、エラーが発生したシナリオ名の一覧を返す"""
+    failed = []
+    for scenario in SCENARIOS:
+        session = SimulatedSession(url, 0.0, random.Random(0))
+        try:
+            await session.connect()
+            await scenario(session)
+        except Exception as e:
+            print(f"{scenario.__name__} でエラーが発生しました: {e!r}", file=sys.stderr)
+            session.errors += 1
+        finally:
+            session.close()
+        if session.errors > 0:
+            failed.append(scenario.__name__)
+    return failed
+
+
+def server_rss(pid):
+    """サーバープロセスの RSS（バイト）を返す。取得できない環境では None"""
+    try:
+        import psutil
+        return psutil.Process(pid).memory_info().rss
+    except ImportError:
+        pass
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return None
+
+
+async def run_level(url, concurrency, duration, think_time, pid):
+    rss_samples = []
+
+    async def sample_rss():
+        while True:
+            rss = server_rss(pid) if pid else None
+            if rss is not None:
+                rss_samples.append(rss)
+            await asyncio.sleep(0.5)
+
+    sampler = asyncio.create_task(sample_rss())
+    start = time.perf_counter()
+    deadline = start + duration
+    sessions = await asyncio.gather(*(run_user(url, deadline, think_time, seed) for seed in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    sampler.cancel()
+
+    latencies = np.array([latency for session in sessions for latency in session.latencies]) * 1000
+    p50, p95, p99 = np.percentile(latencies, [50, 95, 99]) if latencies.size else (np.nan, np.nan, np.nan)
+    return {
+        "同時接続数": concurrency,
+        "再実行数": latencies.size,
+        "エラー": sum(session.errors for session in sessions),
+        "p50(ms)": p50,
+        "p95(ms)": p95,
+        "p99(ms)": p99,
+        "スループット(回/秒)": latencies.size / elapsed,
+        "最大RSS(MB)": max(rss_samples) / 1024 ** 2 if rss_samples else np.nan,
+    }
+
+
+def find_free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_server(port, timeout=60):
+    """Streamlit アプリをローカルで起動し、ヘルスチェックが通るまで待つ"""
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "streamlit", "run", str(APP_PATH),
+         "--server.headless=true", "--server.address=127.0.0.1", f"--server.port={port}",
+         "--server.fileWatcherType=none", "--browser.gatherUsageStats=false"],
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError(f"Streamlit サーバーが終了しました（終了コード {proc.returncode}）")
+        try:
+            with urllib.request.urlopen(f"http://127.0.0.1:{port}/_stcore/health", timeout=1) as response:
+                if response.status == 200:
+                    return proc
+        except OSError:
+            time.sleep(0.2)
+    proc.terminate()
+    raise RuntimeError("Streamlit サーバーの起動がタイムアウトしました")
+
+
+def print_results(results):
+    columns = list(results[0])
+    print("  ".join(f"{c:>12}" for c in columns))
+    for row in results:
+        print("  ".join(f"{v:>12,.1f}" if isinstance(v, float) else f"{v:>12,}" for v in row.values()))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="国際収支・弾力性計算アプリの負荷試験")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 5, 10, 20],
+                        help="順に試す同時接続数（既定: 1 5 10 20）")
+    parser.add_argument("--duration", type=float, default=20.0, help="各同時接続数での計測時間（秒）")
+    parser.add_argument("--think-time", type=float, default=0.5, help="操作間隔の平均（秒）")
+    parser.add_argument("--url", help="起動済みサーバーの WebSocket URL（指定しない場合はアプリを起動）")
+    parser.add_argument("--csv", help="結果を保存する CSV ファイルのパス")
+    args = parser.parse_args()
+
+    proc = None
+    url = args.url
+    if url is None:
+        port = find_free_port()
+        proc = start_server(port)
+        url = f"ws://127.0.0.1:{port}/_stcore/stream"
+
+    results = []
+    try:
+        failed = asyncio.run(smoke_test(url))
+        if failed:
+            sys.exit(f"スモークテストでエラーが発生しました（{', '.join(failed)}）。計測を中止します。"
+                     f"ウィジェットの値は Streamlit {streamlit.__version__} の形式で送っているため、"
+                     "サーバーも同じバージョンの Streamlit（uv.lock では 1.45.0）で起動しているか確認してください。")
+        for concurrency in args.concurrency:
+            print(f"同時接続数 {concurrency} で {args.duration:.0f} 秒間計測しています...", file=sys.stderr)
+            results.append(asyncio.run(run_level(url, concurrency, args.duration, args.think_time,
+                                                 proc.pid if proc else None)))
+    finally:
+        if proc is not None:
+            proc.terminate()
+            proc.wait()
+
+    print_results(results)
+    if args.csv:
+        with open(args.csv, "w", newline="", encoding="utf-8-sig") as f:
+            writer = csv.DictWriter(f, fieldnames=list(results[0]))
+            writer.writeheader()
+            writer.writerows(results)
+
+
+if __name__ == "__main__":
+    main()
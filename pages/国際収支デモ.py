@@ -7,6 +7,8 @@ import matplotlib.pyplot as plt
 import numpy as np
 import matplotlib_fontja
 
+import bop_data
+
 st.set_page_config(page_title="国際収支デモ", layout="wide")
 st.title("\U0001F4B0 国際収支・複式簿記体験アプリ")
 st.markdown("""
@@ -99,6 +101,54 @@ transaction_types = {
     },
 }
 
+
+@st.cache_data(show_spinner="統計データを読み込んでいます...")
+def load_statistics(data, filename):
+    """
+    公表統計のファイルを解析済みキャッシュ経由で読み込み、取引記録と同じ形式に変換する。
+    データの頻度（年次・四半期・月次）と、読み飛ばした期間表記（「合計」や年計など）のリストも返す。
+    """
+    tidy = bop_data.load_bop_file(data, filename)
+    return bop_data.to_records(tidy), str(tidy["頻度"].iloc[0]), tidy.attrs.get("unparsed_periods", [])
+
+
+def format_period(period, frequency):
+    """期間の表示ラベル（2024 / 2024Q1 / 2024-01）"""
+    period = pd.Timestamp(period)
+    if frequency == "年次":
+        return f"{period.year}"
+    if frequency == "四半期":
+        return f"{period.year}Q{period.quarter}"
+    return period.strftime("%Y-%m")
+
+
+# 公表統計の読み込み（読み込んだ場合は国際収支分析タブで取引記録の代わりに使用）
+statistics_df = None
+with st.sidebar:
+    st.header("公表統計の読み込み")
+    st.markdown("BPM6 の項目別に公表されている国際収支統計（CSV / Excel）を分析できます。")
+    uploaded_file = st.file_uploader("統計ファイルを選択", type=["csv", "xlsx", "xlsm"])
+    if uploaded_file is not None:
+        try:
+            statistics_df, statistics_frequency, unparsed_periods = load_statistics(uploaded_file.getvalue(), uploaded_file.name)
+        except ImportError as e:
+            st.error(f"{uploaded_file.name} の読み込みに必要なパッケージがインストールされていません: {e}")
+        except ValueError as e:
+            st.error(f"ファイルを読み込めませんでした: {e}")
+        else:
+            if unparsed_periods:
+                st.warning("期間を解釈できなかった行や頻度の異なる行（年計など）を読み飛ばしました: " + "、".join(unparsed_periods[:10])
+                           + (f" ほか {len(unparsed_periods) - 10} 件" if len(unparsed_periods) > 10 else ""))
+
+    if statistics_df is not None:
+        statistics_unit = st.text_input("金額の単位", "億円")
+        periods = sorted(statistics_df["日時"].unique())
+        if len(periods) >= 2:
+            start, end = st.select_slider("対象期間", options=periods, value=(periods[0], periods[-1]),
+                                          format_func=lambda d: format_period(d, statistics_frequency))
+            statistics_df = statistics_df[statistics_df["日時"].between(start, end)]
+        st.success(f"{statistics_frequency}・{statistics_df['日時'].nunique()} 期間・{len(statistics_df):,} 件のデータを読み込みました")
+
 # タブでUIを分割
 tab1, tab2 = st.tabs(["取引入力", "国際収支分析"])
 
@@ -216,12 +266,17 @@ with tab1:
         st.info("まだ取引が記録されていません。")
 
 with tab2:
-    if not st.session_state.records:
-        st.info("取引を記録すると、ここに分析結果が表示されます。")
+    if statistics_df is None and not st.session_state.records:
+        st.info("取引を記録するか、サイドバーから公表統計を読み込むと、ここに分析結果が表示されます。")
     else:
-        st.subheader("国際収支の集計と分析")
-        
-        df = pd.DataFrame(st.session_state.records)
+        if statistics_df is not None:
+            st.subheader("国際収支の集計と分析（公表統計）")
+            df = statistics_df.copy()
+            unit = statistics_unit
+        else:
+            st.subheader("国際収支の集計と分析")
+            df = pd.DataFrame(st.session_state.records)
+            unit = "ドル"
         
         # 経常収支の詳細分析
         ca_credits = df["経常収支（貸方）"].fillna(0)
@@ -240,14 +295,20 @@ with tab2:
         
         with col1:
             st.markdown("### 国際収支の総括")
-            st.markdown(f"**経常収支合計**: {ca_balance:,.2f} ドル")
-            st.markdown(f"**金融収支合計**: {fa_balance:,.2f} ドル")
-            st.markdown(f"**理論上の差額**: {statistical_discrepancy:,.2f} ドル")
-            
-            if abs(statistical_discrepancy) < 0.001:
-                st.success("✅ 複式簿記が正しく機能しています（借方と貸方が一致）")
+            st.markdown(f"**経常収支合計**: {ca_balance:,.2f} {unit}")
+            st.markdown(f"**金融収支合計**: {fa_balance:,.2f} {unit}")
+            if statistics_df is not None:
+                # 公表統計では 経常収支 − 金融収支 + 資本移転等収支 + 誤差脱漏 = 0 なので、
+                # 差額は取り込んでいない 資本移転等収支 と 誤差脱漏 の合計（符号は逆）にあたる
+                st.markdown(f"**資本移転等収支＋誤差脱漏**: {-statistical_discrepancy:,.2f} {unit}")
+                st.caption("経常収支と金融収支の差額から算出しています。資本移転等収支は読み込み対象外のため、誤差脱漏とは区別できません。")
             else:
-                st.warning(f"⚠️ 誤差脱漏が検出されました: {statistical_discrepancy:,.2f} ドル")
+                st.markdown(f"**理論上の差額**: {statistical_discrepancy:,.2f} {unit}")
+                
+                if abs(statistical_discrepancy) < 0.001:
+                    st.success("✅ 複式簿記が正しく機能しています（借方と貸方が一致）")
+                else:
+                    st.warning(f"⚠️ 誤差脱漏が検出されました: {statistical_discrepancy:,.2f} {unit}")
         
         with col2:
             # 経常収支の内訳
@@ -288,22 +349,21 @@ with tab2:
         with col2:
             # 時系列データの準備
             if len(df) >= 2:
-                # 時系列データを作成
-                df['日時'] = pd.to_datetime(df['日時'])
-                df = df.sort_values('日時')
-                
-                # 経常収支と金融収支の累積推移
-                df['経常収支_純額'] = df["経常収支（貸方）"].fillna(0) - df["経常収支（借方）"].fillna(0)
-                df['金融収支_純額'] = df["金融収支（貸方）"].fillna(0) - df["金融収支（借方）"].fillna(0)
+                # 時系列データを作成（同じ時点のデータは合算）
+                ts = pd.DataFrame({
+                    '日時': pd.to_datetime(df['日時']),
+                    '経常収支_純額': df["経常収支（貸方）"].fillna(0) - df["経常収支（借方）"].fillna(0),
+                    '金融収支_純額': df["金融収支（貸方）"].fillna(0) - df["金融収支（借方）"].fillna(0),
+                }).groupby('日時').sum()
                 
                 # 累積データ
-                df['経常収支_累積'] = df['経常収支_純額'].cumsum()
-                df['金融収支_累積'] = df['金融収支_純額'].cumsum()
+                ts['経常収支_累積'] = ts['経常収支_純額'].cumsum()
+                ts['金融収支_累積'] = ts['金融収支_純額'].cumsum()
                 
                 # 時系列グラフ
                 fig, ax = plt.subplots(figsize=(8, 5))
-                ax.plot(df['日時'], df['経常収支_累積'], label='経常収支累積')
-                ax.plot(df['日時'], df['金融収支_累積'], label='金融収支累積')
+                ax.plot(ts.index, ts['経常収支_累積'], label='経常収支累積')
+                ax.plot(ts.index, ts['金融収支_累積'], label='金融収支累積')
                 ax.set_title('国際収支の累積推移')
                 ax.legend()
                 plt.xticks(rotation=45)
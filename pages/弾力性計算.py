@@ -27,12 +27,17 @@ Features:
     - Assesses whether a currency depreciation will improve the current account balance.
     - Requires user input for export and import elasticities to determine if the 
       condition is satisfied.
+    - Includes a J-curve simulator: a depreciation passes through to import and 
+      export prices over time and volumes adjust with a lag toward the entered 
+      elasticities. Thousands of parameter scenarios are evaluated at once as 
+      NumPy arrays of shape (scenario, period) and shown as a percentile fan chart.
 
 Inputs:
 - Quantities (Q1, Q2)
 - Prices (P1, P2, P1', P2')
 - Income levels (Y1, Y2)
 - Export and import elasticities (Ex, Em)
+- Depreciation rate, pass-through, lags and number of scenarios for the J-curve
 
 Outputs:
 - Intermediate calculations for better understanding.
@@ -45,6 +50,10 @@ Usage:
 - View the results, intermediate steps, and explanations.
 """
 import streamlit as st
+import numpy as np
+import matplotlib.pyplot as plt
+import matplotlib_fontja
+
 st.set_page_config(page_title="弾力性計算機", layout="wide")
 st.title("弾力性計算機")
 st.markdown("""
@@ -52,6 +61,63 @@ st.markdown("""
 """)
 
 
+JCURVE_PERCENTILES = [5, 25, 50, 75, 95]
+
+
+@st.cache_data(show_spinner=False, max_entries=64)
+def simulate_j_curve(ex, em, depreciation, pass_through_x, pass_through_m, price_speed,
+                     volume_lag, volume_speed, import_ratio, spread, n_scenarios, n_periods, seed=0):
+    """
+    自国通貨の減価後の経常収支の経路（Jカーブ）を、パラメータをばらつかせた
+    n_scenarios 個のシナリオについて (シナリオ × 期間) の配列演算でまとめて計算する。
+
+    経常収支は減価前の輸出額を 1 とした自国通貨建てで、減価前からの変化を返す。
+    キャッシュを軽くするため、全シナリオの経路ではなく期間ごとの分位点と要約統計量を返す。
+    """
+    rng = np.random.default_rng(seed)
+    shape = (n_scenarios, 1)
+
+    # シナリオごとのパラメータ（入力値を中心に相対的なばらつき spread で分布させる）
+    ex_s = np.clip(rng.normal(ex, spread * abs(ex), shape), 0, None)
+    em_s = np.clip(rng.normal(em, spread * abs(em), shape), 0, None)
+    rho_x = np.clip(rng.normal(pass_through_x, spread * pass_through_x, shape), 0, 1)
+    rho_m = np.clip(rng.normal(pass_through_m, spread * pass_through_m, shape), 0, 1)
+    price_speed_s = np.clip(rng.normal(price_speed, spread * price_speed, shape), 0.01, 1)
+    volume_speed_s = np.clip(rng.normal(volume_speed, spread * volume_speed, shape), 0.01, 1)
+    lag_s = np.clip(np.rint(rng.normal(volume_lag, spread * volume_lag, shape)), 0, None)
+
+    t = np.arange(n_periods)
+    s = np.log1p(depreciation)
+
+    # 価格への転嫁と数量の調整が進んだ割合（0〜1）
+    price_adjust = 1 - (1 - price_speed_s) ** (t + 1)
+    volume_adjust = np.where(t >= lag_s, 1 - (1 - volume_speed_s) ** np.maximum(t - lag_s + 1, 0), 0.0)
+
+    # 対数価格の変化：輸出は外貨建て価格が下がり、輸入は自国通貨建て価格が上がる
+    log_px_foreign = -rho_x * price_adjust * s
+    log_px_home = s + log_px_foreign
+    log_pm_home = rho_m * price_adjust * s
+
+    # 数量は価格の変化に弾力性で反応するが、調整はラグを伴って進む
+    log_x = -ex_s * volume_adjust * log_px_foreign
+    log_m = -em_s * volume_adjust * log_pm_home
+
+    ca = np.exp(log_px_home + log_x) - import_ratio * np.exp(log_pm_home + log_m) - (1 - import_ratio)
+
+    trough = ca.argmin(axis=1)
+    recovered = (ca > 0) & (t >= trough[:, None])
+    # 期間内に回復しないシナリオは回復時点を無限大として中央値に含める
+    recovery = np.where(recovered.any(axis=1), recovered.argmax(axis=1), np.inf)
+    recovery_period = float(np.median(recovery))
+    return {
+        "bands": np.percentile(ca, JCURVE_PERCENTILES, axis=0),
+        "trough_depth": float(np.median(ca.min(axis=1))),
+        "trough_period": float(np.median(trough)),
+        "recovery_period": recovery_period if np.isfinite(recovery_period) else None,
+        "improved_share": float((ca[:, -1] > 0).mean()),
+    }
+
+
 # 計算する項目を選択
 elasticity_type = st.selectbox(
     "計算する項目を選んでください",
@@ -186,10 +252,64 @@ elif elasticity_type == "マーシャル・ラーナー条件":
     else:
         st.error("マーシャル・ラーナー条件は満たされていません（経常収支の改善は難しい可能性があります）")
 
+    # Jカーブ・シミュレーション
+    st.subheader("Jカーブ・シミュレーション")
+    st.markdown("""
+    自国通貨が減価すると、輸入価格はすぐに上がる一方、輸出入の数量はラグを伴って調整されるため、
+    経常収支は一時的に悪化した後に改善することがあります（Jカーブ効果）。
+    上で入力した弾力性を中心に、パラメータをばらつかせた多数のシナリオで経常収支の経路を計算します。
+    """)
+
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        depreciation = st.slider("自国通貨の減価率（%）", min_value=1, max_value=50, value=10) / 100
+        import_ratio = st.number_input("減価前の輸入額 / 輸出額", min_value=0.1, value=1.0, step=0.1)
+        n_periods = st.slider("シミュレーション期間（月）", min_value=12, max_value=120, value=36)
+    with col2:
+        pass_through_x = st.slider("輸出価格（外貨建て）へのパススルー率", min_value=0.0, max_value=1.0, value=1.0)
+        pass_through_m = st.slider("輸入価格（自国通貨建て）へのパススルー率", min_value=0.0, max_value=1.0, value=1.0)
+        price_speed = st.slider("価格転嫁の速さ（1か月あたり）", min_value=0.05, max_value=1.0, value=0.8)
+    with col3:
+        volume_lag = st.slider("数量調整が始まるまでのラグ（月）", min_value=0, max_value=24, value=3)
+        volume_speed = st.slider("数量調整の速さ（1か月あたり）", min_value=0.01, max_value=1.0, value=0.15)
+        spread = st.slider("パラメータのばらつき（相対標準偏差）", min_value=0.0, max_value=0.5, value=0.2)
+    n_scenarios = st.select_slider("シナリオ数", options=[100, 1000, 2000, 5000, 10000], value=2000)
+
+    result = simulate_j_curve(ex, em, depreciation, pass_through_x, pass_through_m, price_speed,
+                              volume_lag, volume_speed, import_ratio, spread, n_scenarios, n_periods)
+    bands = result["bands"]
+    periods = np.arange(n_periods)
+
+    fig, ax = plt.subplots(figsize=(10, 5))
+    ax.fill_between(periods, bands[0], bands[4], alpha=0.2, color="tab:blue", label="5〜95パーセンタイル")
+    ax.fill_between(periods, bands[1], bands[3], alpha=0.4, color="tab:blue", label="25〜75パーセンタイル")
+    ax.plot(periods, bands[2], color="tab:blue", label="中央値")
+    ax.axhline(0, color="gray", linewidth=0.8)
+    ax.set_xlabel("減価からの経過期間（月）")
+    ax.set_ylabel("経常収支の変化（減価前の輸出額 = 1）")
+    ax.set_title(f"Jカーブ（{n_scenarios:,} シナリオ）")
+    ax.legend()
+    st.pyplot(fig)
+
+    if result["trough_depth"] < 0:
+        recovery = f'{result["recovery_period"]:.0f} か月後' if result["recovery_period"] is not None else "期間内に回復しません"
+        trough_lines = f"""
+    - 経常収支の最も悪化した時点: {result["trough_period"]:.0f} か月後（変化幅 {result["trough_depth"]:.3f}）
+    - 減価前の水準を回復する時点: {recovery}"""
+    else:
+        trough_lines = """
+    - 減価前の水準を下回る時点はなく、Jカーブの落ち込みは生じません"""
+    st.markdown(f"""
+    **シミュレーション結果（シナリオの中央値）**:{trough_lines}
+    - 期間の最後に経常収支が改善しているシナリオの割合: {result["improved_share"]:.1%}
+    """)
+
     # 解説
     st.markdown("""
     **解説**:
     - **為替レート変化に対する輸出量の弾力性（Ex）**: 為替レートが減価した際に輸出量がどれだけ増加するかを示します。
     - **為替レート変化に対する輸入量の弾力性（Em）**: 為替レートが減価した際に輸入量がどれだけ減少するかを示します。
     - **条件の意味**: 自国通貨が減価した場合、輸出が増加し、輸入が減少することで経常収支が改善する可能性があります。ただし、これが成立するためには、Ex + Em > 1 である必要があります。
+    - **パススルー率**: 為替レートの変化が輸出入価格に転嫁される割合です。輸入価格への転嫁が早く、数量の調整が遅いほど、Jカーブの落ち込みは深くなります。
+    - **長期の効果**: 価格と数量の調整が終わると、経常収支の変化はおおよそ「減価率 ×（Ex + Em − 1）」に近づきます（パススルー率が1で、減価前の輸出額と輸入額が等しいとき）。
     """)
@@ -0,0 +1,117 @@
+import pandas as pd
+import pytest
+
+import bop_data
+
+
+def parse_csv(text, filename="bop.csv"):
+    return bop_data.parse_bop_file(text.encode("utf-8"), filename)
+
+
+def test_long_layout():
+    tidy = parse_csv("期間,項目,金額\n2024/01,貿易収支,100\n2024/01,直接投資,50\n")
+    assert tidy["項目"].astype(str).tolist() == ["貿易収支", "直接投資"]
+    assert tidy["金額"].tolist() == [100.0, 50.0]
+    assert (tidy["期間"] == pd.Timestamp("2024-01-01")).all()
+
+
+def test_wide_layout():
+    tidy = parse_csv("年月,貿易収支,サービス収支,備考\n2024/01,100,-20,x\n2024/02,110,-30,y\n")
+    assert len(tidy) == 4
+    assert tidy.groupby("期間")["金額"].sum().tolist() == [80.0, 80.0]
+
+
+def test_sdmx_layout():
+    tidy = parse_csv("TIME_PERIOD,INDICATOR,OBS_VALUE\n2024-M01,Goods,5\n2024-M02,Goods,6\n")
+    assert tidy["期間"].tolist() == [pd.Timestamp("2024-01-01"), pd.Timestamp("2024-02-01")]
+    assert (tidy["頻度"] == "月次").all()
+
+
+@pytest.mark.parametrize(("label", "period", "frequency"), [
+    ("2024/01", "2024-01-01", "月次"),
+    ("2024-01-31", "2024-01-01", "月次"),
+    ("2024.1", "2024-01-01", "月次"),
+    ("2024年1月", "2024-01-01", "月次"),
+    ("２０２４年１月３１日", "2024-01-01", "月次"),
+    ("2024-01-31 00:00:00", "2024-01-01", "月次"),
+    ("202401", "2024-01-01", "月次"),
+    ("2024-M01", "2024-01-01", "月次"),
+    ("2024M1", "2024-01-01", "月次"),
+    ("Jan-2024", "2024-01-01", "月次"),
+    ("2024 January", "2024-01-01", "月次"),
+    ("2024Q2", "2024-04-01", "四半期"),
+    ("2024-Q2", "2024-04-01", "四半期"),
+    ("2024年第2四半期", "2024-04-01", "四半期"),
+    ("Q2 2024", "2024-04-01", "四半期"),
+    ("2024年", "2024-01-01", "年次"),
+    ("2024", "2024-01-01", "年次"),
+])
+def test_period_patterns(label, period, frequency):
+    tidy = parse_csv(f"期間,貿易収支\n{label},1\n")
+    assert tidy["期間"].tolist() == [pd.Timestamp(period)]
+    assert tidy["頻度"].tolist() == [frequency]
+
+
+def test_unparsed_periods_are_reported():
+    tidy = parse_csv("期間,貿易収支\n2024/01,1\n合計,1\n202413,1\n")
+    assert len(tidy) == 1
+    assert tidy.attrs["unparsed_periods"] == ["202413", "合計"]
+
+
+def test_mixed_frequency_keeps_finest():
+    tidy = parse_csv("期間,貿易収支\n2024年,100\n2024年1月,10\n2024年2月,20\n")
+    assert tidy["金額"].sum() == 30.0
+    assert (tidy["頻度"] == "月次").all()
+    assert tidy.attrs["unparsed_periods"] == ["2024年"]
+
+
+def test_no_parsable_period_names_column():
+    with pytest.raises(ValueError, match="期間の列「期間」.*2024年度"):
+        parse_csv("期間,貿易収支\n2024年度,1\n")
+
+
+def test_no_bop_items():
+    with pytest.raises(ValueError, match="国際収支の項目"):
+        parse_csv("期間,売上\n2024/01,1\n")
+
+
+@pytest.mark.parametrize(("text", "amount"), [
+    ("△1,234", -1234.0),
+    ("▲1,234", -1234.0),
+    ("(1,234)", -1234.0),
+    ("-1234", -1234.0),
+    ("１，２３４", 1234.0),
+])
+def test_negative_amounts(text, amount):
+    tidy = parse_csv(f'期間,貿易収支\n2024/01,"{text}"\n')
+    assert tidy["金額"].tolist() == [amount]
+
+
+def test_to_records_signs():
+    tidy = parse_csv("期間,貿易収支,サービス収支,直接投資,証券投資\n2024/01,100,-20,30,-40\n")
+    records = bop_data.to_records(tidy).set_index("取引")
+    # 経常収支は正の値が貸方、負の値が借方
+    assert records.loc["貿易収支", "経常収支（貸方）"] == 100
+    assert pd.isna(records.loc["貿易収支", "経常収支（借方）"])
+    assert records.loc["サービス収支", "経常収支（借方）"] == 20
+    assert pd.isna(records.loc["サービス収支", "経常収支（貸方）"])
+    # 金融収支は正の値（資産の純増）が借方、負の値が貸方
+    assert records.loc["直接投資", "金融収支（借方）"] == 30
+    assert records.loc["直接投資", "金融収支区分_借方"] == "直接投資"
+    assert records.loc["証券投資", "金融収支（貸方）"] == 40
+    assert records.loc["証券投資", "金融収支区分_貸方"] == "証券投資"
+    assert (records["金額"] >= 0).all()
+
+
+def test_cache_hit_keeps_unparsed_periods(tmp_path, monkeypatch):
+    data = "期間,貿易収支\n2024年,100\n2024/01,1\n合計,1\n".encode("utf-8")
+    first = bop_data.load_bop_file(data, "bop.csv", cache_dir=tmp_path)
+    assert len(list(tmp_path.glob(f"*_v{bop_data.CACHE_VERSION}.parquet"))) == 1
+
+    def fail(*args, **kwargs):
+        raise AssertionError("キャッシュがあるのに再解析されました")
+
+    monkeypatch.setattr(bop_data, "parse_bop_file", fail)
+    cached = bop_data.load_bop_file(data, "bop.csv", cache_dir=tmp_path)
+    pd.testing.assert_frame_equal(cached, first)
+    assert cached.attrs["unparsed_periods"] == ["2024年", "合計"]